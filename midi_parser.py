@@ -1,45 +1,68 @@
+import heapq
 import os
 import sys
-import mido
+from collections import namedtuple
+
 from mido import MidiFile
 
+# 轻量帧结构：比每条消息建一个 11 键 dict 省得多（分配快、占用小）
+Frame = namedtuple(
+    "Frame",
+    "time_s tick type channel note velocity control value program pitch tempo",
+)
+
+
+def _merged_messages(tracks):
+    """按绝对 tick 流式合并多轨，避免 merge_tracks 整体物化再排序。"""
+
+    def absolute(track):
+        tick = 0
+        for msg in track:
+            tick += msg.time
+            yield tick, msg
+
+    return heapq.merge(*(absolute(t) for t in tracks), key=lambda item: item[0])
+
 
 def midi_to_frame_list(filepath):
     """
-    解析 MIDI 文件为 Python 列表，每个元素代表一条按时间排序的 MIDI 帧。
+    解析 MIDI 文件为 Frame 列表，每个元素代表一条按时间排序的 MIDI 帧。
     帧字段包括秒、tick、类型和常用消息字段（不存在的字段会是 None）。
     """
     if not os.path.exists(filepath):
         raise FileNotFoundError(filepath)
 
     mid = MidiFile(filepath)
-    tempo = 500000  # 默认 120 BPM
+    # 每 tick 的秒数只在 set_tempo 时变化，预先算好避免逐条调用 tick2second
+    sec_per_tick = 500000 / 1_000_000.0 / mid.ticks_per_beat  # 默认 120 BPM
     tick_acc = 0
+    time_s = 0.0
     frames = []
 
     # 将多轨合并，方便按时间顺序遍历
-    for msg in mido.merge_tracks(mid.tracks):
-        tick_acc += msg.time
-        time_s = mido.tick2second(tick_acc, mid.ticks_per_beat, tempo)
+    for abs_tick, msg in _merged_messages(mid.tracks):
+        time_s += (abs_tick - tick_acc) * sec_per_tick
+        tick_acc = abs_tick
 
         if msg.type == "set_tempo":
             tempo = msg.tempo
+            sec_per_tick = tempo / 1_000_000.0 / mid.ticks_per_beat
 
         if msg.type in ["note_on", "note_off", "control_change",
                         "program_change", "pitchwheel", "set_tempo"]:
-            frames.append({
-                "time_s": time_s,
-                "tick": tick_acc,
-                "type": msg.type,
-                "channel": getattr(msg, "channel", None),
-                "note": getattr(msg, "note", None),
-                "velocity": getattr(msg, "velocity", None),
-                "control": getattr(msg, "control", None),
-                "value": getattr(msg, "value", None),
-                "program": getattr(msg, "program", None),
-                "pitch": getattr(msg, "pitch", None),
-                "tempo": getattr(msg, "tempo", None),
-            })
+            frames.append(Frame(
+                time_s,
+                tick_acc,
+                msg.type,
+                getattr(msg, "channel", None),
+                getattr(msg, "note", None),
+                getattr(msg, "velocity", None),
+                getattr(msg, "control", None),
+                getattr(msg, "value", None),
+                getattr(msg, "program", None),
+                getattr(msg, "pitch", None),
+                getattr(msg, "tempo", None),
+            ))
     return frames
 
 
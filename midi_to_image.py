@@ -1,12 +1,13 @@
+import functools
+import heapq
 import math
 import os
-import random
 import struct
 import zlib
 from dataclasses import dataclass
 from typing import Dict, Iterable, List, Tuple, Union
 
-import mido
+import numpy as np
 from mido import MidiFile
 
 try:
@@ -14,6 +15,11 @@ try:
 except ImportError:
     Image = None  # Pillow is optional; fall back to a minimal PNG writer
 
+try:
+    from midi_to_image_numba import raster_strip as _raster_strip
+except ImportError:
+    _raster_strip = None  # numba is optional; use the NumPy scanline path
+
 # Basic pitch names used for color mapping
 NOTE_NAMES = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
 
@@ -37,8 +43,21 @@ SHARP_COLORS: Dict[str, Tuple[int, int, int]] = {
     "A#": (0, 255, 255),
 }
 
+# Base colors as a (12, 3) array in pitch-class order, for vectorized lookups
+_PALETTE = np.array(
+    [SHARP_COLORS.get(name) or NATURAL_COLORS.get(name, (80, 80, 80)) for name in NOTE_NAMES],
+    dtype=np.int64,
+)
 
-@dataclass
+# Full [note, velocity] -> (r, g, b) lookup table so per-note color resolution
+# is a single array index instead of dict lookups plus arithmetic.
+_VEL_SCALE = 0.4 + 0.6 * (np.arange(128) / 127)
+COLOR_LUT = np.minimum(
+    255, (_PALETTE[np.arange(128) % 12][:, None, :] * _VEL_SCALE[None, :, None]).astype(np.int64)
+).astype(np.uint8)
+
+
+@dataclass(slots=True, frozen=True)
 class NoteSpan:
     note: int
     channel: int
@@ -58,39 +77,59 @@ def note_number_to_name(note_number: int) -> str:
 
 
 def color_for_note(note_number: int, velocity: int) -> Tuple[int, int, int]:
-    base_name = NOTE_NAMES[note_number % 12]
-    if base_name in SHARP_COLORS:
-        base = SHARP_COLORS[base_name]
-    else:
-        base = NATURAL_COLORS.get(base_name, (80, 80, 80))
+    return tuple(COLOR_LUT[note_number % 128, max(0, min(127, velocity))].tolist())
+
+
+@functools.lru_cache(maxsize=8)
+def _open_midi(filepath: str, mtime: float) -> MidiFile:
+    """Parse a MIDI file once per (path, mtime); mtime busts stale entries."""
+    return MidiFile(filepath)
+
+
+def _merged_messages(tracks) -> Iterable[Tuple[int, object]]:
+    """Yield (abs_tick, msg) across tracks in time order.
+
+    Streaming k-way merge over per-track generators; unlike
+    mido.merge_tracks this never materializes (or sorts) the full
+    message list.
+    """
 
-    # Scale brightness by velocity to give long/soft notes softer colors
-    scale = 0.4 + 0.6 * (max(0, min(127, velocity)) / 127)
-    return tuple(min(255, int(c * scale)) for c in base)
+    def absolute(track):
+        tick = 0
+        for msg in track:
+            tick += msg.time
+            yield tick, msg
+
+    return heapq.merge(*(absolute(t) for t in tracks), key=lambda item: item[0])
 
 
 def parse_midi_to_spans(filepath: str) -> List[NoteSpan]:
     if not os.path.exists(filepath):
         raise FileNotFoundError(filepath)
 
-    mid = MidiFile(filepath)
-    tempo = 500000  # default 120 BPM
+    mid = _open_midi(filepath, os.path.getmtime(filepath))
+    # Seconds per tick only changes on set_tempo; keep it precomputed instead
+    # of calling mido.tick2second for every message (default 120 BPM).
+    sec_per_tick = 500000 / 1_000_000.0 / mid.ticks_per_beat
     current_time = 0.0
-    active: Dict[Tuple[int, int], Tuple[float, int]] = {}
+    # Key is (channel << 7) | note packed into one int: channel is 0-15 and
+    # note is 0-127, and int keys hash cheaper than per-event tuples.
+    active: Dict[int, Tuple[float, int]] = {}
     spans: List[NoteSpan] = []
 
-    for msg in mido.merge_tracks(mid.tracks):
-        delta_seconds = mido.tick2second(msg.time, mid.ticks_per_beat, tempo)
-        current_time += delta_seconds
+    prev_tick = 0
+    for abs_tick, msg in _merged_messages(mid.tracks):
+        current_time += (abs_tick - prev_tick) * sec_per_tick
+        prev_tick = abs_tick
 
         if msg.type == "set_tempo":
-            tempo = msg.tempo
+            sec_per_tick = msg.tempo / 1_000_000.0 / mid.ticks_per_beat
             continue
 
         if msg.type == "note_on" and msg.velocity > 0:
-            active[(msg.channel, msg.note)] = (current_time, msg.velocity)
+            active[(msg.channel << 7) | msg.note] = (current_time, msg.velocity)
         elif msg.type == "note_off" or (msg.type == "note_on" and msg.velocity == 0):
-            key = (msg.channel, msg.note)
+            key = (msg.channel << 7) | msg.note
             if key in active:
                 start_time, vel = active.pop(key)
                 spans.append(
@@ -104,11 +143,11 @@ def parse_midi_to_spans(filepath: str) -> List[NoteSpan]:
                 )
 
     # Close any hanging notes at file end
-    for (channel, note), (start_time, vel) in active.items():
+    for key, (start_time, vel) in active.items():
         spans.append(
             NoteSpan(
-                note=note,
-                channel=channel,
+                note=key & 0x7F,
+                channel=key >> 7,
                 start=start_time,
                 end=current_time,
                 velocity=vel,
@@ -122,45 +161,68 @@ def spans_to_color_strip(
     spans: Iterable[NoteSpan],
     pixels_per_second: int = 50,
     background: Tuple[int, int, int] = None,
-) -> List[Tuple[int, int, int]]:
+) -> np.ndarray:
+    """Rasterize spans into a flat (N, 3) uint8 RGB strip."""
     spans = list(spans)
     if not spans:
-        return []
+        return np.zeros((0, 3), dtype=np.uint8)
 
     total_duration = max(span.end for span in spans)
     total_pixels = max(1, int(math.ceil(total_duration * pixels_per_second)))
-    step = 1.0 / pixels_per_second
-    strip: List[Tuple[int, int, int]] = []
-
-    for i in range(total_pixels):
-        t = i * step
-        active = [span for span in spans if span.start <= t < span.end]
-        if not active:
-            if background is None:
-                strip.append((random.randint(0, 255), random.randint(0, 255), random.randint(0, 255)))
-            else:
-                strip.append(background)
-            continue
 
-        r = g = b = 0
-        for span in active:
-            cr, cg, cb = color_for_note(span.note, span.velocity)
-            r += cr
-            g += cg
-            b += cb
-        count = len(active)
-        strip.append((r // count, g // count, b // count))
+    n = len(spans)
+    starts = np.fromiter((s.start for s in spans), dtype=np.float64, count=n)
+    ends = np.fromiter((s.end for s in spans), dtype=np.float64, count=n)
+    notes = np.fromiter((s.note for s in spans), dtype=np.int64, count=n)
+    vels = np.fromiter((s.velocity for s in spans), dtype=np.int64, count=n)
+
+    # Same colors as color_for_note, resolved for all spans in one LUT gather
+    colors = COLOR_LUT[notes % 128, np.clip(vels, 0, 127)].astype(np.int64)
+
+    # Convert span intervals to [start_px, end_px) pixel ranges, then rasterize
+    # with a scanline trick: add the color at start_px, subtract at end_px, and
+    # cumsum to get per-pixel sums. This is O(N + P) in spans and pixels; the
+    # old per-pixel scan over every span was O(N * P).
+    start_px = np.clip(np.ceil(starts * pixels_per_second).astype(np.int64), 0, total_pixels)
+    end_px = np.clip(np.ceil(ends * pixels_per_second).astype(np.int64), 0, total_pixels)
+
+    if _raster_strip is not None:
+        sums, counts = _raster_strip(start_px, end_px, colors, total_pixels)
+    else:
+        color_delta = np.zeros((total_pixels + 1, 3), dtype=np.int64)
+        np.add.at(color_delta, start_px, colors)
+        np.subtract.at(color_delta, end_px, colors)
+        sums = np.cumsum(color_delta[:-1], axis=0)
+
+        count_delta = np.zeros(total_pixels + 1, dtype=np.int64)
+        np.add.at(count_delta, start_px, 1)
+        np.subtract.at(count_delta, end_px, 1)
+        counts = np.cumsum(count_delta[:-1])
+
+    out = np.empty((total_pixels, 3), dtype=np.int64)
+    active = counts > 0
+    # Most pixels in typical piano MIDIs carry exactly one note; copy those
+    # straight through and only pay the integer division where notes overlap
+    single = counts == 1
+    multi = counts > 1
+    out[single] = sums[single]
+    out[multi] = sums[multi] // counts[multi, None]
+    if background is None:
+        out[~active] = np.random.randint(0, 256, (int((~active).sum()), 3))
+    else:
+        out[~active] = background
 
-    return strip
+    return out.astype(np.uint8)
 
 
 def color_strip_to_rect_image(
-    strip: List[Tuple[int, int, int]],
+    strip: np.ndarray,
     ratio: Tuple[int, int] = (4, 3),
     noise: bool = True,
-) -> Union["Image.Image", Tuple[int, int, List[Tuple[int, int, int]]]]:
+) -> Union["Image.Image", Tuple[int, int, np.ndarray]]:
     """Pack the long strip into a rectangle with a target aspect ratio (default 4:3)."""
-    if not strip:
+    strip = np.asarray(strip, dtype=np.uint8).reshape(-1, 3)
+    if strip.size == 0:
         raise ValueError("Color strip is empty")
 
     ratio_w, ratio_h = ratio
@@ -176,28 +238,40 @@ def color_strip_to_rect_image(
 
     if needed > 0:
         if noise:
-            for _ in range(needed):
-                strip.append((random.randint(0, 255), random.randint(0, 255), random.randint(0, 255)))
+            pad = np.random.randint(0, 256, (needed, 3)).astype(np.uint8)
         else:
-            strip.extend([(0, 0, 0)] * needed)
+            pad = np.zeros((needed, 3), dtype=np.uint8)
+        strip = np.concatenate([strip, pad])
+
+    rect = strip[: width * height].reshape(height, width, 3)
 
     if Image:
-        img = Image.new("RGB", (width, height))
-        img.putdata(strip[: width * height])
-        return img
+        # fromarray is zero-copy for a contiguous uint8 array
+        return Image.fromarray(rect, "RGB")
 
     # Pillow not available; return dimensions with raw data for manual saving
-    return width, height, strip[: width * height]
-
-
-def _write_png(path: str, width: int, height: int, data: List[Tuple[int, int, int]]) -> None:
-    raw = bytearray()
-    for y in range(height):
-        raw.append(0)  # filter type 0
-        row_start = y * width
-        for x in range(width):
-            r, g, b = data[row_start + x]
-            raw.extend((r, g, b))
+    return width, height, rect
+
+
+def _write_png(
+    path: str,
+    width: int,
+    height: int,
+    data: np.ndarray,
+    compress_level: int = 6,
+) -> None:
+    # Pack rows in one shot: each scanline is a zero filter byte + raw RGB bytes
+    arr = np.asarray(data, dtype=np.uint8).reshape(height, width * 3)
+    filtered = np.empty((height, 1 + width * 3), dtype=np.uint8)
+    filtered[:, 0] = 0  # filter type 0
+    filtered[:, 1:] = arr
+
+    # Stream rows through one compressor instead of materializing a second
+    # full-image bytes copy for zlib.compress
+    compressor = zlib.compressobj(compress_level, zlib.DEFLATED, 15, 8)
+    parts = [compressor.compress(filtered[y].tobytes()) for y in range(height)]
+    parts.append(compressor.flush())
+    idat_payload = b"".join(parts)
 
     def chunk(tag: bytes, payload: bytes) -> bytes:
         crc = zlib.crc32(tag + payload) & 0xFFFFFFFF
@@ -206,7 +280,7 @@ def _write_png(path: str, width: int, height: int, data: List[Tuple[int, int, in
     png_bytes = (
         b"\x89PNG\r\n\x1a\n"
         + chunk(b"IHDR", struct.pack("!IIBBBBB", width, height, 8, 2, 0, 0, 0))
-        + chunk(b"IDAT", zlib.compress(bytes(raw), level=9))
+        + chunk(b"IDAT", idat_payload)
         + chunk(b"IEND", b"")
     )
 
@@ -0,0 +1,42 @@
+"""Optional Numba-accelerated rasterizer kernel for midi_to_image.
+
+Importing this module requires numba; midi_to_image falls back to the
+plain NumPy scanline path when it is not installed.
+"""
+
+import numpy as np
+from numba import njit
+
+
+@njit(cache=True)
+def raster_strip(start_px, end_px, colors, total_pixels):
+    """Accumulate per-pixel color sums and active counts for span ranges.
+
+    Same delta-then-prefix-sum scheme as the NumPy path, but the scatter
+    and the cumulative sums run as one compiled loop instead of
+    np.add.at (which is slow for repeated indices) plus two cumsums.
+    """
+    color_delta = np.zeros((total_pixels + 1, 3), dtype=np.int64)
+    count_delta = np.zeros(total_pixels + 1, dtype=np.int64)
+    for j in range(start_px.size):
+        s = start_px[j]
+        e = end_px[j]
+        for c in range(3):
+            color_delta[s, c] += colors[j, c]
+            color_delta[e, c] -= colors[j, c]
+        count_delta[s] += 1
+        count_delta[e] -= 1
+
+    sums = np.empty((total_pixels, 3), dtype=np.int64)
+    counts = np.empty(total_pixels, dtype=np.int64)
+    acc_r = acc_g = acc_b = acc_n = 0
+    for i in range(total_pixels):
+        acc_r += color_delta[i, 0]
+        acc_g += color_delta[i, 1]
+        acc_b += color_delta[i, 2]
+        acc_n += count_delta[i]
+        sums[i, 0] = acc_r
+        sums[i, 1] = acc_g
+        sums[i, 2] = acc_b
+        counts[i] = acc_n
+    return sums, counts
@@ -0,0 +1,45 @@
+"""Optional Numba-accelerated analysis kernels for midi_to_prompt.
+
+Importing this module requires numba; midi_to_prompt falls back to the
+plain NumPy reductions when it is not installed.
+"""
+
+from numba import njit
+
+
+@njit(cache=True, fastmath=True)
+def polyphony_stats(times_sorted, deltas_sorted):
+    """Sweep sorted on/off deltas once, returning (max_poly, active_area).
+
+    Fuses the cumsum, max and active-time integral that the NumPy path
+    computes as three separate passes over temporaries.
+    """
+    active = 0
+    max_poly = 0
+    area = 0.0
+    n = times_sorted.size
+    for i in range(n):
+        active += deltas_sorted[i]
+        if active > max_poly:
+            max_poly = active
+        if i < n - 1:
+            area += active * (times_sorted[i + 1] - times_sorted[i])
+    return max_poly, area
+
+
+@njit(cache=True, fastmath=True)
+def interval_stats(notes_sorted):
+    """Return (mean_abs_interval, big_leap_ratio) over consecutive notes."""
+    n = notes_sorted.size
+    if n < 2:
+        return 0.0, 0.0
+    total = 0.0
+    leaps = 0
+    for i in range(n - 1):
+        d = notes_sorted[i + 1] - notes_sorted[i]
+        if d < 0:
+            d = -d
+        total += d
+        if d >= 7:
+            leaps += 1
+    return total / (n - 1), leaps / (n - 1)
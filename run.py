@@ -1,16 +1,51 @@
+"""DashScope qwen-image-plus client: read a prompt txt, generate, download.
+
+The flow is deliberately synchronous: one generation POST followed by a
+short download fan-out, which the pooled Session plus thread pool already
+overlap. An asyncio/aiohttp rewrite would add a dependency and a second
+code path without removing any round-trips from this pipeline.
+"""
+
 import argparse
+import functools
+import gzip
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from threading import Thread
 from urllib.parse import unquote, urlparse
 
 import requests
+from requests.adapters import HTTPAdapter, Retry
+
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None  # optional fast JSON; stdlib json otherwise
+
+try:
+    import httpx  # type: ignore
+except ImportError:
+    httpx = None  # optional HTTP/2 client; requests otherwise
 
 
 API_BASE = "https://dashscope.aliyuncs.com/api/v1"
 MULTIMODAL_URL = f"{API_BASE}/services/aigc/multimodal-generation/generation"
 CONFIG_FILE = Path(".dashscope_config.json")
 
+_API_KEY_HELP = (
+    "DashScope API key not found. "
+    "Set environment variable DASHSCOPE_API_KEY, "
+    "or create .dashscope_config.json with {'api_key': 'sk-xxx'}."
+)
+
+
+@functools.lru_cache(maxsize=4)
+def _load_config(path: str, mtime: float) -> dict:
+    """Parse a config file once per (path, mtime); mtime busts stale entries."""
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
 
 def get_api_key() -> str:
     api_key = os.getenv("DASHSCOPE_API_KEY")
@@ -19,21 +54,15 @@ def get_api_key() -> str:
 
     candidates = [CONFIG_FILE, Path(__file__).resolve().parent / CONFIG_FILE.name]
     for candidate in candidates:
-        if not candidate.exists():
-            continue
         try:
-            data = json.loads(candidate.read_text(encoding="utf-8"))
+            data = _load_config(str(candidate), candidate.stat().st_mtime)
             key = (data.get("api_key") or "").strip()
             if key:
                 return key
         except Exception:
             continue
 
-    raise RuntimeError(
-        "DashScope API key not found. "
-        "Set environment variable DASHSCOPE_API_KEY, "
-        "or create .dashscope_config.json with {'api_key': 'sk-xxx'}."
-    )
+    raise RuntimeError(_API_KEY_HELP)
 
 
 def read_prompt_from_txt(path: Path) -> str:
@@ -45,10 +74,12 @@ def read_prompt_from_txt(path: Path) -> str:
     return text
 
 
+ALLOWED_SIZES = frozenset({"1664*928", "1472*1140", "1328*1328", "1140*1472", "928*1664"})
+
+
 def build_request_body(prompt: str, size: str = "1472*1140") -> dict:
-    allowed_sizes = {"1664*928", "1472*1140", "1328*1328", "1140*1472", "928*1664"}
-    if size not in allowed_sizes:
-        raise ValueError(f"Unsupported size {size!r}. Allowed: {', '.join(sorted(allowed_sizes))}")
+    if size not in ALLOWED_SIZES:
+        raise ValueError(f"Unsupported size {size!r}. Allowed: {', '.join(sorted(ALLOWED_SIZES))}")
     return {
         "model": "qwen-image-plus",
         "input": {
@@ -72,47 +103,127 @@ def build_request_body(prompt: str, size: str = "1472*1140") -> dict:
     }
 
 
-def call_qwen_image(api_key: str, body: dict) -> str:
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {api_key}",
-    }
+def make_session(api_key: str = None, http2: bool = False):
+    """One pooled client for the generation POST and the image GET.
 
-    resp = requests.post(MULTIMODAL_URL, json=body, headers=headers, timeout=60)
+    Keep-alive skips a second TCP+TLS handshake for the CDN download, and
+    the retry policy covers transient gateway/throttling errors. The auth
+    header is attached once here instead of being rebuilt per request.
+    With http2=True (needs httpx), everything multiplexes on one TLS stream.
+    """
+    if http2:
+        if httpx is None:
+            raise RuntimeError("HTTP/2 transport requires httpx (pip install 'httpx[http2]')")
+        return httpx.Client(
+            http2=True,
+            headers={"Authorization": f"Bearer {api_key}"} if api_key else None,
+            limits=httpx.Limits(max_connections=10, max_keepalive_connections=5),
+            timeout=60,
+        )
+
+    session = requests.Session()
+    # Exponential backoff (0.3s, 0.6s, 1.2s...) with jitter so retries from
+    # concurrent runs don't land on the service in lockstep; the jitter
+    # kwargs only exist on urllib3 >= 2, so fall back gracefully.
+    # POST is not in urllib3's default retry whitelist; the generation call
+    # is safe to retry on the gateway errors listed (the job either never
+    # started or failed server-side), and Retry-After headers are honored.
+    retry_kwargs = dict(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=frozenset({"GET", "POST"}),
+        respect_retry_after_header=True,
+    )
+    try:
+        retry = Retry(backoff_jitter=0.5, backoff_max=10.0, **retry_kwargs)
+    except TypeError:
+        retry = Retry(**retry_kwargs)
+    # pool_maxsize matches the download thread pool so parallel image GETs
+    # all get a pooled connection
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if api_key:
+        session.headers["Authorization"] = f"Bearer {api_key}"
+    return session
+
+
+def _err_body(resp) -> str:
+    """First 2 KiB of an error response; 5xx pages can be multi-KB HTML."""
+    return resp.content[:2048].decode("utf-8", "replace")
+
+
+def call_qwen_image(session, body: dict) -> list:
+    raw = orjson.dumps(body) if orjson is not None else json.dumps(body).encode("utf-8")
+    headers = {"Content-Type": "application/json"}
+    # Long prompts (prompt_extend output, batch bodies) are worth compressing
+    # on a slow uplink; compresslevel=1 keeps the CPU cost negligible.
+    if len(raw) > 64 * 1024:
+        raw = gzip.compress(raw, compresslevel=1)
+        headers["Content-Encoding"] = "gzip"
+
+    if isinstance(session, requests.Session):
+        resp = session.post(MULTIMODAL_URL, data=raw, headers=headers, timeout=60)
+    else:  # httpx takes raw bytes via content=
+        resp = session.post(MULTIMODAL_URL, content=raw, headers=headers, timeout=60)
     if resp.status_code != 200:
-        raise RuntimeError(f"HTTP {resp.status_code}: {resp.text}")
+        raise RuntimeError(f"HTTP {resp.status_code}: {_err_body(resp)}")
 
-    data = resp.json()
+    data = orjson.loads(resp.content) if orjson is not None else resp.json()
     try:
         choices = data["output"]["choices"]
         content = choices[0]["message"]["content"]
-        image_url = content[0]["image"]
+        image_urls = [item["image"] for item in content if isinstance(item, dict) and item.get("image")]
     except Exception as exc:
         raise RuntimeError(f"Unexpected response format: {data}") from exc
 
-    if not image_url:
+    if not image_urls:
         raise RuntimeError(f"No image URL in response: {data}")
 
-    return image_url
+    return image_urls
 
 
-def download_image(url: str, output_dir: Path) -> Path:
+def download_image(session, url: str, output_dir: Path) -> Path:
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    resp = requests.get(url, timeout=60)
-    if resp.status_code != 200:
-        raise RuntimeError(f"Failed to download image ({resp.status_code}): {url}")
-
     parsed = urlparse(url)
     filename = Path(unquote(Path(parsed.path).name))
     if not filename.suffix:
         filename = Path("result.png")
-
     target = output_dir / filename
-    target.write_bytes(resp.content)
+
+    # Stream to disk in 1 MiB chunks: constant memory instead of holding the
+    # whole image in resp.content, and writes start before the download ends.
+    if isinstance(session, requests.Session):
+        with session.get(url, stream=True, timeout=60) as resp:
+            if resp.status_code != 200:
+                raise RuntimeError(f"Failed to download image ({resp.status_code}): {url}")
+            with open(target, "wb") as fh:
+                for chunk in resp.iter_content(1 << 20):
+                    fh.write(chunk)
+    else:  # httpx client
+        with session.stream("GET", url, timeout=60) as resp:
+            if resp.status_code != 200:
+                raise RuntimeError(f"Failed to download image ({resp.status_code}): {url}")
+            with open(target, "wb") as fh:
+                for chunk in resp.iter_bytes(1 << 20):
+                    fh.write(chunk)
     return target
 
 
+def download_images(session: requests.Session, urls: list, output_dir: Path) -> list:
+    """Download all result images, in parallel when there is more than one.
+
+    The CDN GETs are independent, so a small thread pool overlaps their
+    latency; the shared Session's pool provides the keep-alive connections.
+    """
+    if len(urls) == 1:
+        return [download_image(session, urls[0], output_dir)]
+    with ThreadPoolExecutor(max_workers=min(len(urls), 8)) as ex:
+        return list(ex.map(lambda u: download_image(session, u, output_dir), urls))
+
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description="Read a txt prompt file, call qwen-image-plus, and save image to image/ directory."
@@ -128,6 +239,11 @@ def parse_args() -> argparse.Namespace:
         default="image",
         help="Directory to save the generated image (default: image)",
     )
+    parser.add_argument(
+        "--http2",
+        action="store_true",
+        help="Use HTTP/2 via httpx so the API call and downloads share one TLS stream",
+    )
     return parser.parse_args()
 
 
@@ -136,16 +252,27 @@ def main() -> None:
     txt_path = Path(args.txt_path)
     output_dir = Path(args.output_dir)
 
-    prompt = read_prompt_from_txt(txt_path)
     api_key = get_api_key()
+    with make_session(api_key, http2=args.http2) as session:
+        # Warm up DNS + TCP + TLS in the background while the prompt file is
+        # read and validated; the pooled connection is ready for the POST.
+        def _warm_up():
+            try:
+                session.head(API_BASE, timeout=5)
+            except Exception:
+                pass  # best-effort; the real request reports any failure
+
+        Thread(target=_warm_up, daemon=True).start()
 
-    body = build_request_body(prompt, size=args.size)
-    image_url = call_qwen_image(api_key, body)
-    saved_path = download_image(image_url, output_dir)
+        prompt = read_prompt_from_txt(txt_path)
+        body = build_request_body(prompt, size=args.size)
+        image_urls = call_qwen_image(session, body)
+        saved_paths = download_images(session, image_urls, output_dir)
 
     print(f"[ok] prompt file: {txt_path}")
-    print(f"[ok] image url: {image_url}")
-    print(f"[ok] saved image to: {saved_path.resolve()}")
+    for image_url, saved_path in zip(image_urls, saved_paths):
+        print(f"[ok] image url: {image_url}")
+        print(f"[ok] saved image to: {saved_path.resolve()}")
 
 
 if __name__ == "__main__":
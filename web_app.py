@@ -6,24 +6,65 @@ Usage:
     python web_app.py
 
 Then open http://localhost:8012 in a browser.
+
+The server is deliberately the stdlib threaded one rather than an
+asyncio/aiohttp app: handlers that block (DashScope calls, Pillow
+compositing) only occupy their own pool thread, the bounded pool plus
+optional pre-forked workers cover the concurrency this tool sees, and
+staying on the stdlib keeps the deploy dependency-free.
 """
 
 import base64
+import binascii
+import gzip
+import hashlib
 import io
 import json
 import os
 import secrets
+import socket
+import sqlite3
+import threading
 import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from http import HTTPStatus
 from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
-from urllib.parse import parse_qs, urlparse
+from urllib.parse import unquote_plus
 from typing import Any, Dict, List, Tuple
 
 import mido
+import numpy as np
 from mido import Message, MetaMessage, MidiFile, MidiTrack
 
+try:
+    import symusic  # type: ignore
+except ImportError:
+    symusic = None  # optional C++ MIDI writer; fall back to mido
+
+try:
+    import pybase64  # type: ignore
+
+    _b64decode = pybase64.b64decode
+except ImportError:
+    _b64decode = base64.b64decode  # optional SIMD base64; stdlib otherwise
+
+try:
+    import orjson  # type: ignore
+
+    def _dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj)
+
+    def _loads(data):
+        return orjson.loads(data or b"{}")
+except ImportError:  # optional fast JSON; stdlib otherwise
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+    def _loads(data):
+        return json.loads(data or b"{}")
+
 import midi_to_image
 import midi_to_prompt
 import run as qwen_client
@@ -38,7 +79,8 @@ IMAGE_DIR = DATA_DIR / "image"
 # Rendering template (production). `assets/template.png` is only for README preview.
 TEMPLATE_FILE = ROOT / "template.png"
 CARDS_DIR = OUTPUT_DIR / "cards"
-SHARES_FILE = DATA_DIR / "shares.json"
+SHARES_FILE = DATA_DIR / "shares.json"  # legacy store, migrated into SHARES_DB
+SHARES_DB = DATA_DIR / "shares.db"
 
 
 def _ensure_dirs() -> None:
@@ -54,88 +96,262 @@ def _ensure_dirs() -> None:
     ):
         folder.mkdir(parents=True, exist_ok=True)
 
-    if not SHARES_FILE.exists():
-        SHARES_FILE.write_text("{}", encoding="utf-8")
+    if TEMPLATE_FILE.exists():
+        try:
+            _get_template()  # decode the card template once, before traffic
+        except Exception:
+            pass  # Pillow missing or unreadable template; the handler reports it
+
+
+_shares_conn = None
+_shares_lock = threading.Lock()
+
+
+def _shares_db() -> sqlite3.Connection:
+    """Shares store: a WAL-mode SQLite DB instead of a rewritten JSON blob.
+
+    Creating a share used to rewrite every existing entry; here inserts
+    append to the WAL and lookups are B-tree indexed. The connection is
+    opened lazily so each pre-forked worker gets its own.
+    """
+    global _shares_conn
+    if _shares_conn is None:
+        conn = sqlite3.connect(str(SHARES_DB), check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS shares (id TEXT PRIMARY KEY, mp3 TEXT, timeline TEXT, ai TEXT)"
+        )
+        _migrate_shares_json(conn)
+        _shares_conn = conn
+    return _shares_conn
 
 
-def _load_shares() -> Dict[str, Dict[str, str]]:
+def _migrate_shares_json(conn: sqlite3.Connection) -> None:
+    """One-time import of the legacy shares.json store."""
+    if not SHARES_FILE.exists():
+        return
     try:
-        return json.loads(SHARES_FILE.read_text(encoding="utf-8") or "{}")
+        old = _loads(SHARES_FILE.read_bytes())
+        conn.executemany(
+            "INSERT OR IGNORE INTO shares VALUES (?, ?, ?, ?)",
+            [
+                (key, entry.get("mp3", ""), entry.get("timeline", ""), entry.get("ai", ""))
+                for key, entry in old.items()
+            ],
+        )
     except Exception:
+        return
+    try:
+        SHARES_FILE.rename(SHARES_FILE.with_suffix(".json.bak"))
+    except OSError:
+        pass
+
+
+def _get_share(share_id: str) -> Dict[str, str]:
+    with _shares_lock:
+        row = _shares_db().execute(
+            "SELECT mp3, timeline, ai FROM shares WHERE id = ?", (share_id,)
+        ).fetchone()
+    if row is None:
         return {}
+    return {"mp3": row[0], "timeline": row[1], "ai": row[2]}
 
 
-def _save_shares(data: Dict[str, Dict[str, str]]) -> None:
-    tmp = SHARES_FILE.with_suffix(".tmp")
-    tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
-    os.replace(tmp, SHARES_FILE)
+def _insert_share(share_id: str, mp3: str, timeline: str, ai: str) -> None:
+    with _shares_lock:
+        _shares_db().execute("INSERT INTO shares VALUES (?, ?, ?, ?)", (share_id, mp3, timeline, ai))
 
 
-def save_midi_from_events(events: List[Dict[str, Any]], bpm: int = 120) -> Path:
-    """Build a MIDI file from a list of {"type","note","velocity","time"} dicts."""
-    if not events:
-        raise ValueError("No MIDI events provided")
+_template_cache = None
 
-    mid = MidiFile(ticks_per_beat=480)
-    track = MidiTrack()
-    mid.tracks.append(track)
 
-    tempo = mido.bpm2tempo(bpm)
-    track.append(MetaMessage("set_tempo", tempo=tempo, time=0))
+def _get_template():
+    """Fresh RGB copy of the card template, decoding the PNG only once."""
+    global _template_cache
+    if _template_cache is None:
+        from PIL import Image  # type: ignore
+
+        decoded = Image.open(TEMPLATE_FILE).convert("RGB")
+        decoded.load()
+        _template_cache = decoded
+    return _template_cache.copy()
+
+
+def _events_to_arrays(events: List[Dict[str, Any]]) -> Tuple[np.ndarray, ...]:
+    """Parse raw browser event dicts into time-sorted (times, notes, vels, ons) arrays."""
+    n = len(events)
+    times = np.empty(n, dtype=np.float64)
+    notes = np.empty(n, dtype=np.int64)
+    vels = np.empty(n, dtype=np.int64)
+    ons = np.empty(n, dtype=bool)
 
-    # Sort by absolute time (seconds from start)
-    safe_events: List[Tuple[float, Dict[str, Any]]] = []
+    count = 0
     for e in events:
         try:
             t = float(e.get("time", 0.0))
-            safe_events.append((t, e))
         except Exception:
             continue
-
-    safe_events.sort(key=lambda x: x[0])
-
-    last_time = 0.0
-    for t, e in safe_events:
         etype = str(e.get("type", "")).lower()
-        note = int(e.get("note", 0))
-        velocity = int(e.get("velocity", 0))
-        delta_seconds = max(0.0, t - last_time)
-        delta_ticks = int(mido.second2tick(delta_seconds, mid.ticks_per_beat, tempo))
-        last_time = t
-
-        if etype == "note_on":
-            msg = Message("note_on", note=note, velocity=max(1, velocity), time=delta_ticks)
-        elif etype == "note_off":
-            msg = Message("note_off", note=note, velocity=velocity, time=delta_ticks)
-        else:
-            # Skip unsupported messages
+        if etype != "note_on" and etype != "note_off":
             continue
+        times[count] = t
+        notes[count] = int(e.get("note", 0))
+        vels[count] = int(e.get("velocity", 0))
+        ons[count] = etype == "note_on"
+        count += 1
 
-        track.append(msg)
+    if count == 0:
+        raise ValueError("No valid note messages to save")
 
-    if len(track) <= 1:
+    order = np.argsort(times[:count], kind="stable")
+    return times[order], notes[order], vels[order], ons[order]
+
+
+def _seconds_to_ticks(times: np.ndarray, tpq: int, tempo: int) -> np.ndarray:
+    """Vectorized mido.second2tick over a whole event array (fixed tempo)."""
+    return np.rint(times * (tpq * 1_000_000.0 / tempo)).astype(np.int64)
+
+
+def _dump_midi_symusic(
+    path: Path,
+    times: np.ndarray,
+    notes: np.ndarray,
+    vels: np.ndarray,
+    ons: np.ndarray,
+    bpm: int,
+    tempo: int,
+) -> None:
+    """Write via symusic's C++ MIDI serializer.
+
+    note_on/note_off pairs become Note(start, duration) objects: a stable
+    sort by pitch keeps time order within each pitch, so an on directly
+    followed by an off of the same pitch is one note. Unmatched note_ons
+    are closed at the last event.
+    """
+    tpq = 480
+    ticks = _seconds_to_ticks(times, tpq, tempo)
+
+    order = np.argsort(notes, kind="stable")
+    pitch_s = notes[order]
+    on_s = ons[order]
+    tick_s = ticks[order]
+    vel_s = vels[order]
+
+    pair = np.zeros(len(pitch_s), dtype=bool)
+    if len(pitch_s) > 1:
+        pair[:-1] = on_s[:-1] & ~on_s[1:] & (pitch_s[:-1] == pitch_s[1:])
+    on_idx = np.flatnonzero(pair)
+    hang_idx = np.flatnonzero(on_s & ~pair)
+
+    starts = np.concatenate([tick_s[on_idx], tick_s[hang_idx]])
+    durations = np.concatenate([tick_s[on_idx + 1] - tick_s[on_idx], ticks[-1] - tick_s[hang_idx]])
+    pitches = np.concatenate([pitch_s[on_idx], pitch_s[hang_idx]])
+    velocities = np.maximum(1, np.concatenate([vel_s[on_idx], vel_s[hang_idx]]))
+
+    if len(starts) == 0:
         raise ValueError("No valid note messages to save")
 
+    score = symusic.Score(tpq)
+    score.tempos.append(symusic.Tempo(0, float(bpm)))
+    track = symusic.Track("", 0, False)
+    track.notes = symusic.Note.from_numpy(starts, durations, pitches, velocities, symusic.TimeUnit.tick)
+    score.tracks.append(track)
+    score.dump_midi(str(path))
+
+
+def _dump_midi_mido(
+    path: Path,
+    times: np.ndarray,
+    notes: np.ndarray,
+    vels: np.ndarray,
+    ons: np.ndarray,
+    tempo: int,
+) -> None:
+    """Pure-Python fallback writer when symusic is not installed."""
+    mid = MidiFile(ticks_per_beat=480)
+    track = MidiTrack()
+    mid.tracks.append(track)
+    track.append(MetaMessage("set_tempo", tempo=tempo, time=0))
+
+    # Delta ticks from absolute ticks in one pass; deriving deltas from the
+    # absolute positions also avoids accumulating per-event rounding error.
+    deltas = np.diff(_seconds_to_ticks(times, mid.ticks_per_beat, tempo), prepend=0)
+    for note, velocity, is_on, delta in zip(notes, vels, ons, deltas):
+        if is_on:
+            track.append(Message("note_on", note=int(note), velocity=max(1, int(velocity)), time=int(delta)))
+        else:
+            track.append(Message("note_off", note=int(note), velocity=int(velocity), time=int(delta)))
+
+    mid.save(path)
+
+
+def save_midi_from_events(events: List[Dict[str, Any]], bpm: int = 120) -> Path:
+    """Build a MIDI file from a list of {"type","note","velocity","time"} dicts."""
+    if not events:
+        raise ValueError("No MIDI events provided")
+
+    times, notes, vels, ons = _events_to_arrays(events)
+    tempo = mido.bpm2tempo(bpm)
+
     # Use final timestamp to keep filenames roughly ordered
-    timestamp_ms = int(max(last_time, 0) * 1000)
+    timestamp_ms = int(max(float(times[-1]), 0) * 1000)
     filename = f"web_recording_{timestamp_ms:013d}.mid"
     path = FILES_DIR / filename
-    mid.save(path)
+
+    if symusic is not None:
+        _dump_midi_symusic(path, times, notes, vels, ons, bpm, tempo)
+    else:
+        _dump_midi_mido(path, times, notes, vels, ons, tempo)
     return path
 
 
+# build_visuals results keyed by MIDI content hash: the save flow renders a
+# recording and the magic-image flow would otherwise render it all over again.
+_visuals_cache: Dict[str, Tuple[Path, Path, str]] = {}
+
+
 def build_visuals(midi_path: Path) -> Tuple[Path, Path, str]:
     """Generate the timing image and prompt text for a MIDI file."""
+    digest = hashlib.blake2b(midi_path.read_bytes(), digest_size=16).hexdigest()
+    cached = _visuals_cache.get(digest)
+    if cached and cached[0].exists() and cached[1].exists():
+        return cached
+
     base = midi_path.stem
     image_path = OUTPUT_DIR / f"{base}.png"
     prompt_path = PROMPTS_DIR / f"{base}.txt"
 
-    midi_to_image.midi_to_image(str(midi_path), str(image_path))
-    prompt_path_str = midi_to_prompt.midi_to_prompt(str(midi_path), output_dir=str(PROMPTS_DIR))
-    prompt_text = Path(prompt_path_str).read_text(encoding="utf-8").strip()
+    # The timing image and the prompt are independent; overlap them (the
+    # heavy lifting is in C extensions that release the GIL).
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        image_future = ex.submit(midi_to_image.midi_to_image, str(midi_path), str(image_path))
+        prompt_future = ex.submit(midi_to_prompt.midi_to_prompt, str(midi_path), output_dir=str(PROMPTS_DIR))
+        image_future.result()
+        prompt_path_str = prompt_future.result()
+    # bytes-first read: one C-level decode instead of read_text's incremental
+    # decoder, and the strip happens on the raw bytes
+    prompt_text = Path(prompt_path_str).read_bytes().strip().decode("utf-8")
+    _visuals_cache[digest] = (image_path, prompt_path, prompt_text)
     return image_path, prompt_path, prompt_text
 
 
+_http_session = None
+
+
+def _get_session():
+    """Lazily build one shared DashScope session for the whole server.
+
+    ThreadingHTTPServer handles each request on its own thread; the pooled
+    Session keeps connections warm across successive generate calls instead
+    of re-handshaking TLS per request.
+    """
+    global _http_session
+    if _http_session is None:
+        _http_session = qwen_client.make_session(qwen_client.get_api_key())
+    return _http_session
+
+
 def magic_image_from_midi(
     midi_path: Path,
     size: str = "1664*928",
@@ -143,17 +359,82 @@ def magic_image_from_midi(
     """Call DashScope qwen-image-plus to turn the prompt into an image."""
     _, _, prompt_text = build_visuals(midi_path)
 
-    api_key = qwen_client.get_api_key()
     body = qwen_client.build_request_body(prompt_text, size=size)
-    image_url = qwen_client.call_qwen_image(api_key, body)
-    saved_path = qwen_client.download_image(image_url, IMAGE_DIR)
+    session = _get_session()
+    image_urls = qwen_client.call_qwen_image(session, body)
+    saved_paths = qwen_client.download_images(session, image_urls, IMAGE_DIR)
+
+    return saved_paths[0], {"prompt": prompt_text, "image_url": image_urls[0]}
 
-    return saved_path, {"prompt": prompt_text, "image_url": image_url}
+
+# index.html re-read from disk only when its mtime changes
+_index_cache: Dict[str, Any] = {"mtime": -1.0, "data": b""}
+
+
+def _index_bytes() -> bytes:
+    mtime = INDEX_FILE.stat().st_mtime
+    if mtime != _index_cache["mtime"]:
+        _index_cache["data"] = INDEX_FILE.read_bytes()
+        _index_cache["mtime"] = mtime
+    return _index_cache["data"]
+
+
+# Share-page skeleton rendered once at import; per-request work is three
+# C-level bytes.replace calls instead of rebuilding the page via f-string.
+_SHARE_PAGE = """<!doctype html>
+<html lang="zh-CN">
+<head>
+  <meta charset="utf-8" />
+  <meta name="viewport" content="width=device-width, initial-scale=1" />
+  <title>化乐为图 · 下载</title>
+  <style>
+    body { margin: 0; font-family: system-ui, -apple-system, Segoe UI, Roboto, Arial; background: #f7fbff; color: #0f1f3a; }
+    .wrap { max-width: 720px; margin: 0 auto; padding: 18px; }
+    h1 { margin: 8px 0 6px; font-size: 20px; }
+    p { margin: 0 0 14px; color: #4b5c7a; line-height: 1.55; }
+    .grid { display: grid; gap: 10px; }
+    .card { display:flex; align-items:center; justify-content:space-between; padding: 12px 14px; border: 1px solid rgba(26,76,178,0.18); border-radius: 14px; background: rgba(255,255,255,0.8); }
+    .k { font-weight: 600; }
+    .btn { display:inline-block; padding: 10px 14px; border-radius: 12px; border: 1px solid rgba(26,76,178,0.24); background: linear-gradient(135deg, #2c73ff, #5cb7ff); color: white; text-decoration: none; }
+    .muted { color: #4b5c7a; }
+  </style>
+</head>
+<body>
+  <div class="wrap">
+    <h1>下载本次作品</h1>
+    <p>包含：录音 MP3、时序图、AI 成图。</p>
+    <div class="grid">
+      __MP3__
+      __TIMELINE__
+      __AI__
+    </div>
+  </div>
+</body>
+</html>""".encode("utf-8")
+
+
+def _link_block(label: str, href: str) -> bytes:
+    if not href:
+        html = f"<div class='card'><div class='k'>{label}</div><div class='v muted'>未提供</div></div>"
+    else:
+        html = (
+            "<div class='card'>"
+            f"<div class='k'>{label}</div>"
+            f"<a class='btn' href='{href}' target='_blank' rel='noreferrer'>打开/下载</a>"
+            "</div>"
+        )
+    return html.encode("utf-8")
 
 
 class AppHandler(SimpleHTTPRequestHandler):
     """Serve static files plus a small JSON API."""
 
+    # Buffered response stream: the base handler already coalesces headers
+    # into one write via its internal buffer, and with a buffered wfile the
+    # status line, headers and body all leave in a single send() when the
+    # request finishes instead of one syscall per wfile.write.
+    wbufsize = -1
+
     def do_OPTIONS(self) -> None:  # CORS preflight
         self.send_response(HTTPStatus.NO_CONTENT)
         self.send_header("Access-Control-Allow-Origin", "*")
@@ -162,7 +443,7 @@ class AppHandler(SimpleHTTPRequestHandler):
         self.end_headers()
 
     def _send_json(self, payload: Dict[str, Any], status: int = 200) -> None:
-        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        data = _dumps(payload)
         self.send_response(status)
         self.send_header("Content-Type", "application/json; charset=utf-8")
         self.send_header("Access-Control-Allow-Origin", "*")
@@ -170,10 +451,32 @@ class AppHandler(SimpleHTTPRequestHandler):
         self.end_headers()
         self.wfile.write(data)
 
+    def copyfile(self, source, outputfile):
+        """Serve static files with os.sendfile where the platform has it.
+
+        Zero-copy from page cache to socket instead of shuttling the file
+        through Python bytes; falls back to the base copy loop otherwise.
+        """
+        if hasattr(os, "sendfile"):
+            try:
+                size = os.fstat(source.fileno()).st_size
+                outputfile.flush()  # push buffered headers before raw fd writes
+                offset = os.sendfile(outputfile.fileno(), source.fileno(), 0, size)
+            except (OSError, ValueError, io.UnsupportedOperation):
+                pass  # non-regular source or platform refused; copy below
+            else:
+                while offset < size:
+                    sent = os.sendfile(outputfile.fileno(), source.fileno(), offset, size - offset)
+                    if sent == 0:
+                        break
+                    offset += sent
+                return
+        super().copyfile(source, outputfile)
+
     def do_GET(self) -> None:
         if self.path in {"/", "/index", "/index.html"}:
             if INDEX_FILE.exists():
-                data = INDEX_FILE.read_bytes()
+                data = _index_bytes()
                 self.send_response(HTTPStatus.OK)
                 self.send_header("Content-Type", "text/html; charset=utf-8")
                 self.send_header("Content-Length", str(len(data)))
@@ -189,7 +492,7 @@ class AppHandler(SimpleHTTPRequestHandler):
         try:
             content_length = int(self.headers.get("Content-Length", "0"))
             body = self.rfile.read(content_length) if content_length > 0 else b"{}"
-            payload = json.loads(body.decode("utf-8") or "{}")
+            payload = _loads(body)
         except Exception:
             self._send_json({"ok": False, "error": "Invalid JSON body"}, status=400)
             return
@@ -212,71 +515,45 @@ class AppHandler(SimpleHTTPRequestHandler):
         if value.startswith("http://") or value.startswith("https://"):
             raise ValueError("Only local paths are supported")
         value = value.lstrip("/")
-        candidate = (ROOT / value).resolve()
-        if ROOT not in candidate.parents and candidate != ROOT:
+        # Lexical normalization instead of resolve(): no realpath syscall per
+        # path component, and ".." traversal is still caught by the prefix check.
+        candidate = Path(os.path.normpath(str(ROOT / value)))
+        if candidate != ROOT and not str(candidate).startswith(str(ROOT) + os.sep):
             raise ValueError("Invalid path")
         return candidate
 
     def handle_share_page(self) -> None:
-        parsed = urlparse(self.path)
-        qs = parse_qs(parsed.query)
-        share_id = (qs.get("id") or [""])[0].strip()
+        # Hand-rolled query parsing: the page takes a handful of known scalar
+        # params, so skip parse_qs's dict-of-lists construction. First value
+        # wins, capped at 16 pairs.
+        params: Dict[str, str] = {}
+        for pair in self.path.partition("?")[2].split("&")[:16]:
+            key, _, value = pair.partition("=")
+            if key and key not in params:
+                params[key] = unquote_plus(value)
+        share_id = params.get("id", "").strip()
 
         if share_id:
-            shares = _load_shares()
-            entry = shares.get(share_id, {})
+            entry = _get_share(share_id)
             mp3 = entry.get("mp3", "")
             timeline = entry.get("timeline", "")
             ai = entry.get("ai", "")
         else:
-            mp3 = (qs.get("mp3") or [""])[0]
-            timeline = (qs.get("timeline") or [""])[0]
-            ai = (qs.get("ai") or [""])[0]
-
-        def link_block(label: str, href: str) -> str:
-            if not href:
-                return f"<div class='card'><div class='k'>{label}</div><div class='v muted'>未提供</div></div>"
-            return (
-                "<div class='card'>"
-                f"<div class='k'>{label}</div>"
-                f"<a class='btn' href='{href}' target='_blank' rel='noreferrer'>打开/下载</a>"
-                "</div>"
-            )
+            mp3 = params.get("mp3", "")
+            timeline = params.get("timeline", "")
+            ai = params.get("ai", "")
 
-        html = f"""<!doctype html>
-<html lang="zh-CN">
-<head>
-  <meta charset="utf-8" />
-  <meta name="viewport" content="width=device-width, initial-scale=1" />
-  <title>化乐为图 · 下载</title>
-  <style>
-    body {{ margin: 0; font-family: system-ui, -apple-system, Segoe UI, Roboto, Arial; background: #f7fbff; color: #0f1f3a; }}
-    .wrap {{ max-width: 720px; margin: 0 auto; padding: 18px; }}
-    h1 {{ margin: 8px 0 6px; font-size: 20px; }}
-    p {{ margin: 0 0 14px; color: #4b5c7a; line-height: 1.55; }}
-    .grid {{ display: grid; gap: 10px; }}
-    .card {{ display:flex; align-items:center; justify-content:space-between; padding: 12px 14px; border: 1px solid rgba(26,76,178,0.18); border-radius: 14px; background: rgba(255,255,255,0.8); }}
-    .k {{ font-weight: 600; }}
-    .btn {{ display:inline-block; padding: 10px 14px; border-radius: 12px; border: 1px solid rgba(26,76,178,0.24); background: linear-gradient(135deg, #2c73ff, #5cb7ff); color: white; text-decoration: none; }}
-    .muted {{ color: #4b5c7a; }}
-  </style>
-</head>
-<body>
-  <div class="wrap">
-    <h1>下载本次作品</h1>
-    <p>包含：录音 MP3、时序图、AI 成图。</p>
-    <div class="grid">
-      {link_block("录音 MP3", mp3)}
-      {link_block("时序图", timeline)}
-      {link_block("AI 成图", ai)}
-    </div>
-  </div>
-</body>
-</html>"""
+        data = (
+            _SHARE_PAGE.replace(b"__MP3__", _link_block("录音 MP3", mp3))
+            .replace(b"__TIMELINE__", _link_block("时序图", timeline))
+            .replace(b"__AI__", _link_block("AI 成图", ai))
+        )
 
-        data = html.encode("utf-8")
         self.send_response(HTTPStatus.OK)
         self.send_header("Content-Type", "text/html; charset=utf-8")
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            data = gzip.compress(data, compresslevel=1)
+            self.send_header("Content-Encoding", "gzip")
         self.send_header("Content-Length", str(len(data)))
         self.end_headers()
         self.wfile.write(data)
@@ -299,10 +576,8 @@ class AppHandler(SimpleHTTPRequestHandler):
             self._send_json({"ok": False, "error": str(exc)}, status=400)
             return
 
-        shares = _load_shares()
         share_id = secrets.token_urlsafe(8)
-        shares[share_id] = {"mp3": "/" + mp3.lstrip("/"), "timeline": "/" + timeline.lstrip("/"), "ai": "/" + ai.lstrip("/")}
-        _save_shares(shares)
+        _insert_share(share_id, "/" + mp3.lstrip("/"), "/" + timeline.lstrip("/"), "/" + ai.lstrip("/"))
 
         self._send_json({"ok": True, "id": share_id, "share_path": f"/share?id={share_id}"})
 
@@ -370,21 +645,25 @@ class AppHandler(SimpleHTTPRequestHandler):
             self._send_json({"ok": False, "error": "data is required"}, status=400)
             return
 
-        try:
-            if "," in raw_data:
-                raw_data = raw_data.split(",", 1)[1]
-            audio_bytes = base64.b64decode(raw_data)
-        except Exception:
-            self._send_json({"ok": False, "error": "Failed to decode audio data"}, status=400)
-            return
+        stem = Path(filename).stem or "recording"
+        suffix = Path(filename).suffix or ".mp3"
+        timestamp = int(time.time() * 1000)
+        target = FILES_DIR / f"{stem}_{timestamp}{suffix}"
 
+        # Decode straight to disk in 1 MiB slices (a multiple of 4 chars, so
+        # each slice is valid base64 on its own) instead of materializing the
+        # whole decoded blob next to the base64 string.
+        offset = raw_data.find(",") + 1  # skip a data-URL prefix if present
+        chunk = 1 << 20
         try:
-            stem = Path(filename).stem or "recording"
-            suffix = Path(filename).suffix or ".mp3"
-            timestamp = int(time.time() * 1000)
-            target = FILES_DIR / f"{stem}_{timestamp}{suffix}"
             target.parent.mkdir(parents=True, exist_ok=True)
-            target.write_bytes(audio_bytes)
+            with open(target, "wb") as fh:
+                for i in range(offset, len(raw_data), chunk):
+                    fh.write(_b64decode(raw_data[i : i + chunk]))
+        except binascii.Error:
+            target.unlink(missing_ok=True)
+            self._send_json({"ok": False, "error": "Failed to decode audio data"}, status=400)
+            return
         except Exception as exc:
             self._send_json({"ok": False, "error": str(exc)}, status=500)
             return
@@ -423,18 +702,33 @@ class AppHandler(SimpleHTTPRequestHandler):
             raw = str(qr_data_url).strip()
             if raw.startswith(prefix) and "," in raw:
                 raw = raw.split(",", 1)[1]
-            qr_bytes = base64.b64decode(raw)
+            qr_bytes = _b64decode(raw)
         except Exception:
             self._send_json({"ok": False, "error": "Invalid qr_data_url"}, status=400)
             return
 
-        def paste_contain(base: "Image.Image", overlay: "Image.Image", box: Tuple[int, int, int, int], resample: int) -> None:
+        def paste_contain(
+            base: "Image.Image",
+            overlay: "Image.Image",
+            box: Tuple[int, int, int, int],
+            resample: int,
+            prereduce: bool = False,
+        ) -> None:
             x1, y1, x2, y2 = box
             bw, bh = max(1, x2 - x1), max(1, y2 - y1)
             ow, oh = overlay.size
             scale = min(bw / max(1, ow), bh / max(1, oh))
             nw, nh = max(1, int(ow * scale)), max(1, int(oh * scale))
-            resized = overlay.resize((nw, nh), resample=resample)
+            if (nw, nh) == overlay.size:
+                resized = overlay  # already at target size; skip the resample
+            else:
+                if prereduce:
+                    # Integer box-reduce first when shrinking by 2x or more: cuts
+                    # the LANCZOS convolution work ~factor^2 with no visible loss.
+                    factor = int(min(ow / nw, oh / nh))
+                    if factor >= 2:
+                        overlay = overlay.reduce(factor)
+                resized = overlay.resize((nw, nh), resample=resample)
             px = x1 + (bw - nw) // 2
             py = y1 + (bh - nh) // 2
             if resized.mode in ("RGBA", "LA"):
@@ -443,8 +737,12 @@ class AppHandler(SimpleHTTPRequestHandler):
                 base.paste(resized, (px, py))
 
         try:
-            base = Image.open(TEMPLATE_FILE).convert("RGBA")
-            ai_img = Image.open(ai_path).convert("RGBA")
+            # The card is fully opaque, so composite in RGB: half the memory
+            # traffic of RGBA and no convert before the final save.
+            base = _get_template()
+            ai_img = Image.open(ai_path)
+            if ai_img.mode != "RGBA":
+                ai_img = ai_img.convert("RGB")
             qr_img = Image.open(io.BytesIO(qr_bytes)).convert("RGBA")
         except Exception as exc:
             self._send_json({"ok": False, "error": str(exc)}, status=500)
@@ -453,7 +751,7 @@ class AppHandler(SimpleHTTPRequestHandler):
         ai_box = (776, 38, 2773, 1577)
         qr_box = (49, 1147, 720, 1798)
         resampling = getattr(Image, "Resampling", Image)
-        paste_contain(base, ai_img, ai_box, resample=getattr(resampling, "LANCZOS", Image.LANCZOS))
+        paste_contain(base, ai_img, ai_box, resample=getattr(resampling, "LANCZOS", Image.LANCZOS), prereduce=True)
         # QR: avoid non-integer scaling (hurts scanning). If it fits, paste 1:1 centered.
         x1, y1, x2, y2 = qr_box
         bw, bh = max(1, x2 - x1), max(1, y2 - y1)
@@ -466,19 +764,62 @@ class AppHandler(SimpleHTTPRequestHandler):
 
         timestamp = int(time.time() * 1000)
         out_path = CARDS_DIR / f"share_card_{timestamp}.png"
-        try:
-            base.convert("RGB").save(out_path)
-        except Exception:
-            base.save(out_path)
+        # zlib level 1: a few times faster to encode than Pillow's default 6
+        # for a modestly bigger file; the card is served once then discarded.
+        base.save(out_path, "PNG", compress_level=1)
 
         self._send_json({"ok": True, "card_path": str(out_path.relative_to(ROOT))})
 
 
-def run(host: str = "0.0.0.0", port: int = 8012) -> None:
+class _Server(ThreadingHTTPServer):
+    """ThreadingHTTPServer with a bounded worker pool and SO_REUSEPORT.
+
+    The pool caps concurrent handlers near 2x the core count instead of
+    spawning an unbounded thread per connection; SO_REUSEPORT (where the
+    platform has it) lets several worker processes bind the same port and
+    have the kernel balance connections across them.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, *args, **kwargs):
+        self._pool = ThreadPoolExecutor(max_workers=2 * (os.cpu_count() or 2))
+        super().__init__(*args, **kwargs)
+
+    def server_bind(self):
+        if hasattr(socket, "SO_REUSEPORT"):
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self.process_request_thread, request, client_address)
+
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown(wait=False)
+
+
+def run(host: str = "0.0.0.0", port: int = 8012, workers: int = 1) -> None:
+    """Serve the studio; workers > 1 pre-forks that many processes.
+
+    Pre-forking needs os.fork and SO_REUSEPORT (POSIX only) and mainly
+    helps when several browsers hammer the CPU-heavy endpoints at once;
+    the single-process default is right for local use.
+    """
     _ensure_dirs()
     handler = lambda *args, **kwargs: AppHandler(*args, directory=str(ROOT), **kwargs)
-    server = ThreadingHTTPServer((host, port), handler)
-    print(f"[midi2image] serving at http://{host}:{port}")
+
+    workers = max(1, int(workers or 1))
+    if workers > 1 and not (hasattr(os, "fork") and hasattr(socket, "SO_REUSEPORT")):
+        print("[midi2image] pre-fork needs os.fork + SO_REUSEPORT; serving single-process")
+        workers = 1
+    for _ in range(workers - 1):
+        if os.fork() == 0:  # children fall through to serve their own socket
+            break
+    else:
+        print(f"[midi2image] serving at http://{host}:{port}" + (f" ({workers} workers)" if workers > 1 else ""))
+
+    server = _Server((host, port), handler)
     try:
         server.serve_forever()
     except KeyboardInterrupt:
@@ -488,4 +829,4 @@ def run(host: str = "0.0.0.0", port: int = 8012) -> None:
 
 
 if __name__ == "__main__":
-    run()
+    run(workers=int(os.environ.get("MIDI2IMAGE_WORKERS", "1")))